@@ -11,6 +11,7 @@ with patch('wazuh.core.common.getgrnam'):
             with patch('wazuh.core.common.wazuh_gid'):
                 sys.modules['wazuh.rbac.orm'] = MagicMock()
 
+                from wazuh.core import configuration
                 from wazuh.core.cluster import utils
                 from wazuh import WazuhError, WazuhException, WazuhInternalError
                 from wazuh.core.results import WazuhResult
@@ -37,7 +38,9 @@ def test_read_cluster_config():
         with pytest.raises(WazuhError, match='.* 3006 .*'):
             utils.read_cluster_config()
 
-    with patch('wazuh.core.configuration.load_wazuh_xml', return_value=SystemExit):
+    with patch('wazuh.core.configuration.load_wazuh_xml_iter', return_value=SystemExit):
+        # The previous successful call cached the parsed ossec.conf, so drop it to reach the patched parser
+        configuration._parse_ossec_conf_cached.cache_clear()
         with pytest.raises(SystemExit) as pytest_wrapped_e:
             utils.read_cluster_config(from_import=True)
         assert pytest_wrapped_e.type == SystemExit
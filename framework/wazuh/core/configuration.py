@@ -2,7 +2,6 @@
 # Created by Wazuh, Inc. <info@wazuh.com>.
 # This program is free software; you can redistribute it and/or modify it under the terms of GPLv2
 
-import json
 import logging
 import os
 import re
@@ -10,17 +9,35 @@ import subprocess
 import sys
 import tempfile
 from configparser import RawConfigParser, NoOptionError
+from copy import deepcopy
+from functools import lru_cache
 from io import StringIO
 from os import remove, path as os_path
 from typing import Union
 
-from defusedxml.ElementTree import tostring
-from defusedxml.minidom import parseString
+# XML and tostring only work on trees built by the hardened defusedxml parser, so the faster stdlib implementations
+# are safe here
+from xml.etree.ElementTree import XML, Element, TreeBuilder, indent, tostring
+
+from defusedxml.ElementTree import XMLParser as DefusedXMLParser
+
+try:
+    # lxml parses and pretty-prints noticeably faster than ElementTree. It is optional: deploys without it fall back
+    # to the stdlib implementation below.
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
+
+try:
+    # orjson decodes the socket replies several times faster than the stdlib parser and is optional as well
+    import orjson as json
+except ImportError:
+    import json
 
 from wazuh.core import common
 from wazuh.core.exception import WazuhInternalError, WazuhError
 from wazuh.core.exception import WazuhResourceNotFound
-from wazuh.core.utils import cut_array, load_wazuh_xml, safe_move
+from wazuh.core.utils import cut_array, load_wazuh_xml_iter, safe_move
 from wazuh.core.wazuh_socket import WazuhSocket
 
 logger = logging.getLogger('wazuh')
@@ -110,6 +127,60 @@ conf_sections = {
     }
 }
 
+# 'list_options' membership is checked for every parsed option, so store them as frozensets
+for _section in conf_sections.values():
+    _section['list_options'] = frozenset(_section['list_options'])
+
+# Compiled regular expressions used by the RCL and rootkit file parsers. They are matched against lines whose leading
+# whitespace has already been stripped, so no '^\s*' anchor is needed.
+# [Application name] [any or all] [reference]
+_RE_RCL_TITLE = re.compile(r"\[(.*)\]\s*\[(.*)\]\s*\[(.*)\]\s*")
+# {CIS: 1.1.2 RHEL7} / {PCI: 2.3} / {PCI_DSS: 2.2}
+_RE_RCL_NAME_KV = re.compile(r"\{(\w+):\s*([^}]+)\}")
+# type: '<entry name>;'
+_RE_RCL_CHECK = re.compile(r"(\w:.+)")
+_RE_RCL_VAR = re.compile(r"\$(\w+)=(.+)")
+# file_name ! Name ::Link to it
+_RE_ROOTKIT_FILES_CHECK = re.compile(r"(.+)!(.+)::(.+)")
+# file_name !string_to_search!Description
+_RE_ROOTKIT_TROJANS_CHECK = re.compile(r"(.+)!(.+)!(.+)")
+_RE_ROOTKIT_TROJANS_BINARY_CHECK = re.compile(r"(.+)!(.+)!")
+
+# Serialized <localfile><query> content and the indentation to strip from it
+_RE_LOCALFILE_QUERY = re.compile(r'<query>(.*)</query>', re.DOTALL)
+_RE_LOCALFILE_QUERY_INDENT = re.compile(r'(?:\n +)')
+
+# Sentinels protecting escaped characters while an uploaded group configuration goes through the XML parser
+_CUSTOM_ENTITIES = {
+    '_custom_open_tag_': '\\<',
+    '_custom_close_tag_': '\\>',
+    '_custom_amp_lt_': '&lt;',
+    '_custom_amp_gt_': '&gt;'
+}
+_RE_CUSTOM_ENTITY = re.compile('|'.join(re.escape(character) for character in _CUSTOM_ENTITIES.values()))
+_CUSTOM_ENTITY_REPLACEMENTS = {character: sentinel for sentinel, character in _CUSTOM_ENTITIES.items()}
+
+# Escape sequences produced while pretty-printing an uploaded configuration. Every one of them is a fixed token,
+# so they are reverted with plain str.replace instead of a regular expression.
+_UNESCAPE_MAP = {'&amp;': '&', '&lt;': '<', '&quot;': '"', '&gt;': '>', '\\\n': '\\'}
+
+# Paths derived from the install directory, static for the whole process lifetime
+_SOCKETS_PATH = os_path.join(common.WAZUH_PATH, "queue", "sockets")
+_AUTHD_PASS_PATH = os_path.join(common.WAZUH_PATH, "etc", "authd.pass")
+_VERIFY_AGENT_CONF_BIN = os_path.join(common.WAZUH_PATH, "bin", "verify-agent-conf")
+
+# Components exposing an active configuration through their control socket
+_VALID_COMPONENTS = frozenset({"agent", "agentless", "analysis", "auth", "com", "csyslog", "integrator",
+                               "logcollector", "mail", "monitor", "request", "syscheck", "wmodules"})
+_VALID_COMPONENTS_MSG = f'Valid components: {", ".join(sorted(_VALID_COMPONENTS))}'
+
+# Socket replies mapped to error 1117, scanned in a single pass
+_ERR_1117_RE = re.compile("No such file or directory|Cannot send request")
+
+# verify-agent-conf error lines, e.g. "2019/01/08 14:51:09 verify-agent-conf: ERROR: (1230): <message>"
+_RE_VERIFY_AGENT_CONF_ERR = re.compile(r"\d{4}/\d{2}/\d{2} \d{2}:\d{2}:\d{2} verify-agent-conf: ERROR: "
+                                       r"\(\d+\): ([\w /_\-.':]+)")
+
 
 def _insert(json_dst: dict, section_name: str, option: str, value: str):
     """Insert element (option:value) in a section (json_dst) called section_name.
@@ -130,12 +201,13 @@ def _insert(json_dst: dict, section_name: str, option: str, value: str):
         return
 
     if option in json_dst:
-        if type(json_dst[option]) is list:
+        if isinstance(json_dst[option], list):
             json_dst[option].append(value)  # Append new values
         else:
             json_dst[option] = value  # Update values
     else:
-        if section_name in conf_sections and option in conf_sections[section_name]['list_options']:
+        section_cfg = conf_sections.get(section_name)
+        if section_cfg is not None and option in section_cfg['list_options']:
             json_dst[option] = [value]  # Create as list
         else:
             json_dst[option] = value  # Update values
@@ -154,28 +226,33 @@ def _insert_section(json_dst: dict, section_name: str, section_data: dict):
         Section be added.
     """
 
-    if section_name in conf_sections and conf_sections[section_name]['type'] == 'duplicate':
+    section_cfg = conf_sections.get(section_name)
+    section_type = section_cfg['type'] if section_cfg is not None else None
+
+    if section_type == 'duplicate':
         if section_name in json_dst:
             json_dst[section_name].append(section_data)  # Append new values
         else:
             json_dst[section_name] = [section_data]  # Create as list
-    elif section_name in conf_sections and conf_sections[section_name]['type'] == 'merge':
+    elif section_type == 'merge':
         if section_name in json_dst:
+            dst_section = json_dst[section_name]
+            list_options = section_cfg['list_options']
             for option in section_data:
-                if option in json_dst[section_name] and option in conf_sections[section_name]['list_options']:
-                    json_dst[section_name][option].extend(section_data[option])  # Append new values
+                if option in dst_section and option in list_options:
+                    dst_section[option].extend(section_data[option])  # Append new values
                 else:
-                    json_dst[section_name][option] = section_data[option]  # Update values
+                    dst_section[option] = section_data[option]  # Update values
         else:
             json_dst[section_name] = section_data  # Create
-    elif section_name in conf_sections and conf_sections[section_name]['type'] == 'last':
+    elif section_type == 'last':
         if section_name in json_dst:
             # if the option already exists it is overwritten. But a warning is shown.
             logger.warning(f'There are multiple {section_name} sections in configuration. Using only last section.')
         json_dst[section_name] = section_data  # Create
 
 
-def _read_option(section_name: str, opt: str) -> tuple:
+def _read_option(section_name: str, opt: str, opt_name: str = None) -> tuple:
     """Read an option (inside a section) and returns the name and the value.
 
     Parameters
@@ -184,6 +261,8 @@ def _read_option(section_name: str, opt: str) -> tuple:
         Name of the section to be read.
     opt : str
         Option to be read.
+    opt_name : str
+        Lowercased tag of the option, when the caller has already computed it.
 
     Returns
     -------
@@ -191,13 +270,12 @@ def _read_option(section_name: str, opt: str) -> tuple:
         Name and value of the option.
     """
 
-    opt_name = opt.tag.lower()
+    if opt_name is None:
+        opt_name = opt.tag.lower()
 
     if section_name == 'open-scap':
         if opt.attrib:
-            opt_value = {}
-            for a in opt.attrib:
-                opt_value[a] = opt.attrib[a]
+            opt_value = dict(opt.attrib)
             # profiles
             profiles_list = []
             for profiles in opt.iter():
@@ -210,44 +288,42 @@ def _read_option(section_name: str, opt: str) -> tuple:
     elif section_name == 'syscheck' and opt_name == 'directories':
         opt_value = []
 
-        json_attribs = {}
-        for a in opt.attrib:
-            json_attribs[a] = opt.attrib[a]
-
         if opt.text:
-            for path in opt.text.split(','):
-                json_path = json_attribs.copy()
-                json_path['path'] = path.strip()
-                opt_value.append(json_path)
+            if opt.attrib:
+                json_attribs = dict(opt.attrib)
+                for path in opt.text.split(','):
+                    json_path = json_attribs.copy()
+                    json_path['path'] = path.strip()
+                    opt_value.append(json_path)
+            else:
+                # No attributes to propagate, so skip the per-path dict copy
+                opt_value = [{'path': path.strip()} for path in opt.text.split(',')]
     elif section_name == 'syscheck' and opt_name in ('synchronization', 'whodata'):
         opt_value = {}
         for child in opt:
-            child_section, child_config = _read_option(child.tag.lower(), child)
-            opt_value[child_section] = child_config.split(',') if child_config.find(',') > 0 else child_config
+            child_tag = child.tag.lower()
+            child_section, child_config = _read_option(child_tag, child, child_tag)
+            opt_value[child_section] = child_config.split(',') if isinstance(child_config, str) \
+                and ',' in child_config else child_config
     elif (section_name == 'cluster' and opt_name == 'nodes') or \
             (section_name == 'sca' and opt_name == 'policies'):
         opt_value = [child.text for child in opt]
     elif section_name == 'labels' and opt_name == 'label':
-        opt_value = {'value': opt.text}
-        for a in opt.attrib:
-            opt_value[a] = opt.attrib[a]
+        opt_value = {'value': opt.text, **opt.attrib}
     elif section_name == 'localfile' and opt_name == 'query':
         # Remove new lines, empty spaces and backslashes
-        regex = rf'<{opt_name}>(.*)</{opt_name}>'
-        opt_value = re.match(regex,
-                             re.sub('(?:(\n) +)', '',
-                                    tostring(opt, encoding='unicode').replace('\\<', '<').replace('\\>', '>')
-                                    ).strip()).group(1)
+        text = tostring(opt, encoding='unicode').replace('\\<', '<').replace('\\>', '>')
+        opt_value = _RE_LOCALFILE_QUERY.match(_RE_LOCALFILE_QUERY_INDENT.sub('', text).strip()).group(1)
     elif section_name == 'remote' and opt_name == 'protocol':
-        opt_value = [elem.strip() for elem in opt.text.split(',')]
+        # Common case: a single protocol, no split needed
+        opt_value = [elem.strip() for elem in opt.text.split(',')] if ',' in opt.text else [opt.text.strip()]
     else:
-        if opt.attrib or list(opt):
-            opt_value = {}
-            for a in opt.attrib:
-                opt_value[a] = opt.attrib[a]
-            if list(opt):
+        if opt.attrib or len(opt):
+            opt_value = dict(opt.attrib)
+            if len(opt):
                 for child in opt:
-                    child_section, child_config = _read_option(child.tag.lower(), child)
+                    child_tag = child.tag.lower()
+                    child_section, child_config = _read_option(child_tag, child, child_tag)
                     opt_value[child_section] = child_config
             else:
                 opt_value['item'] = opt.text
@@ -257,6 +333,30 @@ def _read_option(section_name: str, opt: str) -> tuple:
     return opt_name, _replace_custom_values(opt_value)
 
 
+def _replace_list_custom_values(opt_value: list) -> list:
+    return [_replace_custom_values(item) for item in opt_value]
+
+
+def _replace_dict_custom_values(opt_value: dict) -> dict:
+    for key in opt_value.keys():
+        opt_value[key] = _replace_custom_values(opt_value[key])
+    return opt_value
+
+
+def _replace_str_custom_values(opt_value: str) -> str:
+    # Fast path: most values do not contain any custom entity
+    if '_custom_amp_' not in opt_value:
+        return opt_value
+    return opt_value.replace('_custom_amp_lt_', '&lt;').replace('_custom_amp_gt_', '&gt;')
+
+
+_REPLACE_CUSTOM_VALUES_DISPATCH = {
+    list: _replace_list_custom_values,
+    dict: _replace_dict_custom_values,
+    str: _replace_str_custom_values
+}
+
+
 def _replace_custom_values(opt_value: Union[list, dict, str]) -> Union[list, dict, str]:
     """Replace custom values introduced by 'load_wazuh_xml' with their real values.
 
@@ -265,18 +365,11 @@ def _replace_custom_values(opt_value: Union[list, dict, str]) -> Union[list, dic
     opt_value : list or dict or str
         Value to be replaced.
     """
-    if type(opt_value) is list:
-        for i in range(0, len(opt_value)):
-            opt_value[i] = _replace_custom_values(opt_value[i])
-    elif type(opt_value) is dict:
-        for key in opt_value.keys():
-            opt_value[key] = _replace_custom_values(opt_value[key])
-    elif type(opt_value) is str:
-        return opt_value.replace('_custom_amp_lt_', '&lt;').replace('_custom_amp_gt_', '&gt;')
-    return opt_value
+    handler = _REPLACE_CUSTOM_VALUES_DISPATCH.get(type(opt_value))
+    return handler(opt_value) if handler is not None else opt_value
 
 
-def _conf2json(src_xml: str, dst_json: dict):
+def _conf2json(src_xml: str, dst_json: dict, only_sections: frozenset = None):
     """Parse src_xml to JSON. It is inserted in dst_json.
 
     Parameters
@@ -285,15 +378,21 @@ def _conf2json(src_xml: str, dst_json: dict):
         Configuration to be parsed to JSON.
     dst_json : dict
         Destination.
+    only_sections : frozenset
+        If given, only the sections with these names are parsed; any other section is skipped without reading its
+        options.
     """
 
-    for section in list(src_xml):
-        section_name = section.attrib['name'] if section.tag.lower() == 'wodle' else section.tag.lower()
+    for section in src_xml:
+        section_tag = section.tag.lower()
+        section_name = section.attrib['name'] if section_tag == 'wodle' else section_tag
+        if only_sections is not None and section_name not in only_sections:
+            continue
         section_json = {}
 
-        for option in list(section):
+        for option in section:
             option_name, option_value = _read_option(section_name, option)
-            if type(option_value) is list and not (section_name == 'remote' and option_name == 'protocol'):
+            if isinstance(option_value, list) and not (section_name == 'remote' and option_name == 'protocol'):
                 for ov in option_value:
                     _insert(section_json, section_name, option_name, ov)
             else:
@@ -302,13 +401,16 @@ def _conf2json(src_xml: str, dst_json: dict):
         _insert_section(dst_json, section_name, section_json)
 
 
-def _ossecconf2json(xml_conf: str) -> dict:
+def _ossecconf2json(xml_conf: str, only_sections: frozenset = None) -> dict:
     """Return ossec.conf in JSON from XML.
 
     Parameters
     ----------
-    xml_conf : str
-        Configuration to be parsed to JSON.
+    xml_conf : Element or iterator
+        Configuration to be parsed to JSON. It can be a fully parsed tree or an iterator over its top-level elements,
+        such as the one returned by `load_wazuh_xml_iter`.
+    only_sections : frozenset
+        If given, only the sections with these names are parsed.
 
     Returns
     -------
@@ -317,9 +419,9 @@ def _ossecconf2json(xml_conf: str) -> dict:
     """
     final_json = {}
 
-    for root in list(xml_conf):
+    for root in xml_conf:
         if root.tag.lower() == "ossec_config":
-            _conf2json(root, final_json)
+            _conf2json(root, final_json, only_sections=only_sections)
 
     return final_json
 
@@ -329,8 +431,9 @@ def _agentconf2json(xml_conf: str) -> dict:
 
     Parameters
     ----------
-    xml_conf : str
-        Configuration to be parsed to JSON.
+    xml_conf : Element or iterator
+        Configuration to be parsed to JSON. It can be a fully parsed tree or an iterator over its top-level elements,
+        such as the one returned by `load_wazuh_xml_iter`.
 
     Returns
     -------
@@ -339,26 +442,25 @@ def _agentconf2json(xml_conf: str) -> dict:
     """
 
     final_json = []
+    # Index of every filters set already read, so repeated ones are merged without a linear search
+    filters_index = {}
 
-    for root in xml_conf.iter():
+    roots = xml_conf.iter() if isinstance(xml_conf, Element) else (e for top in xml_conf for e in top.iter())
+    for root in roots:
         if root.tag.lower() == "agent_config":
             # Get attributes (os, name, profile)
-            filters = {}
-            for attr in root.attrib:
-                filters[attr] = root.attrib[attr]
+            filters = dict(root.attrib)
 
             # Check if we have read the same filters before (we will need to merge them)
-            previous_config = -1
-            for idx, item in enumerate(final_json):
-                if 'filters' in item and item['filters'] == filters:
-                    previous_config = idx
-                    break
+            filters_key = tuple(sorted(filters.items()))
+            previous_config = filters_index.get(filters_key, -1)
 
             if previous_config != -1:
                 _conf2json(root, final_json[previous_config]['config'])
             else:
                 config = {}
                 _conf2json(root, config)
+                filters_index[filters_key] = len(final_json)
                 final_json.append({'filters': filters, 'config': config})
 
     return final_json
@@ -385,24 +487,17 @@ def _rcl2json(filepath: str) -> dict:
     """
 
     data = {'vars': {}, 'controls': []}
-    # [Application name] [any or all] [reference]
-    # type: '<entry name>;'
-    regex_comment = re.compile(r"^\s*#")
-    regex_title = re.compile(r"^\s*\[(.*)\]\s*\[(.*)\]\s*\[(.*)\]\s*")
-    regex_name_groups = re.compile(r"({\w+:\s+\S+\s*\S*\})")
-    regex_check = re.compile(r"^\s*(\w:.+)")
-    regex_var = re.compile(r"^\s*\$(\w+)=(.+)")
 
     try:
         item = {}
 
         with open(filepath) as f:
             for line in f:
-                if re.search(regex_comment, line):
+                stripped = line.lstrip()
+                if not stripped or stripped.startswith('#'):
                     continue
 
-                match_title = re.search(regex_title, line)
-                if match_title:
+                if match_title := _RE_RCL_TITLE.match(stripped):
                     # Previous
                     data['controls'].append(item)
 
@@ -418,18 +513,13 @@ def _rcl2json(filepath: str) -> dict:
                     item['name'] = name[:end_name].strip()
 
                     # Extract PCI and CIS from name
-                    name_groups = list()
-                    name_groups.extend(re.findall(regex_name_groups, name))
-
                     cis, pci = list(), list()
 
-                    for group in name_groups:
-                        # {CIS: 1.1.2 RHEL7}
-                        g_value = group.split(':')[-1][:-1].strip()
-                        if 'CIS' in group:
-                            cis.append(g_value)
-                        elif 'PCI' in group:
-                            pci.append(g_value)
+                    for key, value in _RE_RCL_NAME_KV.findall(name):
+                        if 'CIS' in key:
+                            cis.append(value.strip())
+                        elif 'PCI' in key:
+                            pci.append(value.strip())
 
                     item['cis'] = cis
                     item['pci'] = pci
@@ -443,13 +533,11 @@ def _rcl2json(filepath: str) -> dict:
 
                     continue
 
-                match_checks = re.search(regex_check, line)
-                if match_checks:
+                if match_checks := _RE_RCL_CHECK.match(stripped):
                     item['checks'].append(match_checks.group(1))
                     continue
 
-                match_var = re.search(regex_var, line)
-                if match_var:
+                if match_var := _RE_RCL_VAR.match(stripped):
                     data['vars'][match_var.group(1)] = match_var.group(2)
                     continue
 
@@ -483,17 +571,14 @@ def _rootkit_files2json(filepath: str) -> dict:
 
     data = []
 
-    # file_name ! Name ::Link to it
-    regex_comment = re.compile(r"^\s*#")
-    regex_check = re.compile(r"^(.+)!(.+)::(.+)")
-
     try:
         with open(filepath) as f:
             for line in f:
-                if re.search(regex_comment, line):
+                stripped = line.lstrip()
+                if not stripped or stripped.startswith('#'):
                     continue
 
-                if match_check := re.search(regex_check, line):
+                if match_check := _RE_ROOTKIT_FILES_CHECK.match(stripped):
                     new_check = {'filename': match_check.group(1).strip(), 'name': match_check.group(2).strip(),
                                  'link': match_check.group(3).strip()}
                     data.append(new_check)
@@ -526,19 +611,15 @@ def _rootkit_trojans2json(filepath: str) -> dict:
 
     data = []
 
-    # file_name !string_to_search!Description
-    regex_comment = re.compile(r"^\s*#")
-    regex_check = re.compile(r"^(.+)!(.+)!(.+)")
-    regex_binary_check = re.compile(r"^(.+)!(.+)!")
-
     try:
         with open(filepath) as f:
             for line in f:
-                if re.search(regex_comment, line):
+                stripped = line.lstrip()
+                if not stripped or stripped.startswith('#'):
                     continue
 
-                match_check = re.search(regex_check, line)
-                match_binary_check = re.search(regex_binary_check, line)
+                match_check = _RE_ROOTKIT_TROJANS_CHECK.match(stripped)
+                match_binary_check = _RE_ROOTKIT_TROJANS_BINARY_CHECK.match(stripped)
                 if match_check:
                     new_check = {'filename': match_check.group(1).strip(), 'name': match_check.group(2).strip(),
                                  'description': match_check.group(3).strip()}
@@ -568,8 +649,31 @@ def _ar_conf2json(file_path: str) -> dict:
         ar.conf file as dictionary.
     """
     with open(file_path) as f:
-        data = [line.strip('\n') for line in f.readlines()]
-    return data
+        return [line.rstrip('\n') for line in f]
+
+
+@lru_cache(maxsize=4)
+def _parse_ossec_conf_cached(conf_file: str, mtime_ns: int, only_sections: frozenset = None) -> dict:
+    """Parse an ossec.conf file, caching the result keyed by path and modification time.
+
+    Parameters
+    ----------
+    conf_file : str
+        Path of the configuration file to read.
+    mtime_ns : int
+        Modification time of the file, in nanoseconds. Only used as part of the cache key so the cached entry is
+        discarded when the file changes.
+    only_sections : frozenset
+        If given, only the sections with these names are parsed.
+
+    Returns
+    -------
+    dict
+        ossec.conf as dictionary.
+    """
+    # Read XML incrementally: each <ossec_config> block is cleared once converted, so peak memory stays proportional
+    # to the largest block instead of the whole file
+    return _ossecconf2json(load_wazuh_xml_iter(conf_file), only_sections=only_sections)
 
 
 # Main functions
@@ -605,11 +709,11 @@ def get_ossec_conf(section: str = None, field: str = None, conf_file: str = comm
         ossec.conf (manager) as dictionary.
     """
     try:
-        # Read XML
-        xml_data = load_wazuh_xml(conf_file)
-
-        # Parse XML to JSON
-        data = _ossecconf2json(xml_data)
+        # Parse XML to JSON. When a section is requested, every other section is skipped without reading its options.
+        # The parse is cached keyed by the file's modification time, so the cached entry is deep copied to keep
+        # callers' mutations away from the cache.
+        data = deepcopy(_parse_ossec_conf_cached(conf_file, os.stat(conf_file).st_mtime_ns,
+                                                 only_sections=frozenset((section,)) if section else None))
     except Exception as e:
         if not from_import:
             raise WazuhError(1101, extra_message=str(e))
@@ -684,8 +788,8 @@ def get_agent_conf(group_id: str = None, offset: int = 0, limit: int = common.DA
                 return data
         # Parse XML to JSON
         else:
-            # Read XML
-            xml_data = load_wazuh_xml(agent_conf)
+            # Read XML incrementally to avoid materializing the whole tree
+            xml_data = load_wazuh_xml_iter(agent_conf)
 
             data = _agentconf2json(xml_data)
     except Exception as e:
@@ -734,8 +838,8 @@ def get_agent_conf_multigroup(multigroup_id: str = None, offset: int = 0, limit:
         raise WazuhError(1006, extra_message=os_path.join("WAZUH_PATH", "var", "multigroups", agent_conf))
 
     try:
-        # Read XML
-        xml_data = load_wazuh_xml(agent_conf)
+        # Read XML incrementally to avoid materializing the whole tree
+        xml_data = load_wazuh_xml_iter(agent_conf)
 
         # Parse XML to JSON
         data = _agentconf2json(xml_data)
@@ -811,6 +915,32 @@ def get_file_conf(filename: str, group_id: str = None, type_conf: str = None, re
     return data
 
 
+@lru_cache(maxsize=4)
+def _get_internal_options_config(config_path: str, mtime_ns: int) -> RawConfigParser:
+    """Read an internal options file, caching the parser keyed by path and modification time.
+
+    Parameters
+    ----------
+    config_path : str
+        Configuration path.
+    mtime_ns : int
+        Modification time of the file, in nanoseconds. Only used as part of the cache key so the cached entry is
+        discarded when the file changes.
+
+    Returns
+    -------
+    RawConfigParser
+        Parsed configuration.
+    """
+    with open(config_path) as f:
+        str_config = StringIO('[root]\n' + f.read())
+
+    config = RawConfigParser()
+    config.read_file(str_config)
+
+    return config
+
+
 def parse_internal_options(high_name: str, low_name: str) -> str:
     """Parse internal_options.conf file.
 
@@ -834,26 +964,9 @@ def parse_internal_options(high_name: str, low_name: str) -> str:
         Value of the internal_options.conf option.
     """
 
-    def get_config(config_path: str) -> dict:
-        """Read configuration given by its path.
-
-        Parameters
-        ----------
-        config_path : str
-            Configuration path.
-
-        Returns
-        -------
-        dict
-            Configuration as a dictionary.
-        """
-        with open(config_path) as f:
-            str_config = StringIO('[root]\n' + f.read())
-
-        config = RawConfigParser()
-        config.read_file(str_config)
-
-        return config
+    def get_config(config_path: str) -> RawConfigParser:
+        """Return the cached parser for the configuration given by its path."""
+        return _get_internal_options_config(config_path, os.stat(config_path).st_mtime_ns)
 
     if not os_path.exists(common.INTERNAL_OPTIONS_CONF):
         raise WazuhInternalError(1107)
@@ -938,38 +1051,50 @@ def upload_group_configuration(group_id: str, file_content: str) -> str:
     str
         Confirmation message.
     """
-    if not os_path.exists(os_path.join(common.SHARED_PATH, group_id)):
+    group_path = os_path.join(common.SHARED_PATH, group_id)
+    if not os_path.exists(group_path):
         raise WazuhResourceNotFound(1710, group_id)
     # path of temporary files for parsing xml input
     handle, tmp_file_path = tempfile.mkstemp(prefix='api_tmp_file_', suffix='.xml', dir=common.OSSEC_TMP_PATH)
     # create temporary file for parsing xml input and validate XML format
     try:
-        with open(handle, 'w') as tmp_file:
-            custom_entities = {
-                '_custom_open_tag_': '\\<',
-                '_custom_close_tag_': '\\>',
-                '_custom_amp_lt_': '&lt;',
-                '_custom_amp_gt_': '&gt;'
-            }
-
-            # Replace every custom entity
-            for character, replacement in custom_entities.items():
-                file_content = re.sub(replacement.replace('\\', '\\\\'), character, file_content)
+        with open(handle, 'w', buffering=65536) as tmp_file:
+            # Replace every custom entity in a single pass
+            file_content = _RE_CUSTOM_ENTITY.sub(lambda match: _CUSTOM_ENTITY_REPLACEMENTS[match.group(0)],
+                                                 file_content)
+
+            # Beautify xml file, preferring lxml when available
+            wrapped_content = f'<root>\n{file_content}\n</root>'
+            if lxml_etree is not None:
+                # XXE-safe: entity resolution and network access are disabled explicitly
+                # XML with whitespace-only text nodes cannot be pretty-printed, so drop them while parsing
+                xml = lxml_etree.fromstring(wrapped_content.encode(),
+                                            parser=lxml_etree.XMLParser(resolve_entities=False, no_network=True,
+                                                                        remove_blank_text=True))
+                beautified = lxml_etree.tostring(xml, pretty_print=True, encoding='unicode')
+            else:
+                # The hardened parser is fed a tree builder that keeps XML comments, like lxml does by default
+                xml = XML(wrapped_content, parser=DefusedXMLParser(target=TreeBuilder(insert_comments=True)))
+                indent(xml, space='  ')
+                beautified = tostring(xml, encoding='unicode')
 
-            # Beautify xml file using a defusedxml.minidom.parseString
-            xml = parseString(f'<root>\n{file_content}\n</root>')
+            # Remove <root> and </root> tags, and empty lines
+            lines = [line for line in beautified.split('\n') if line.strip()]
+            pretty_xml = '\n'.join(lines[1:-1]) + '\n'
 
-            # Remove first line (XML specification: <? xmlversion="1.0" ?>), <root> and </root> tags, and empty lines
-            pretty_xml = '\n'.join(filter(lambda x: x.strip(), xml.toprettyxml(indent='  ').split('\n')[2:-2])) + '\n'
+            # Revert the serializer escaping. All the tokens are fixed strings, so str.replace is enough
+            for escaped, character in _UNESCAPE_MAP.items():
+                pretty_xml = pretty_xml.replace(escaped, character)
 
-            # Revert xml.dom replacements and remove any whitespaces and '\n' between '\' and '<' if present
-            # github.com/python/cpython/blob/8e0418688906206fe59bd26344320c0fc026849e/Lib/xml/dom/minidom.py#L305
-            pretty_xml = re.sub(r'(?:(?<=\\) +)', '', pretty_xml.replace("&amp;", "&").replace("&lt;", "<")
-                                .replace("&quot;", "\"", ).replace("&gt;", ">").replace("\\\n", "\\"))
+            # Remove any whitespaces left between '\' and the rest of the content without a lookbehind regex
+            if '\\ ' in pretty_xml:
+                parts = pretty_xml.split('\\')
+                pretty_xml = parts[0] + ''.join('\\' + part.lstrip(' ') for part in parts[1:])
 
-            # Restore the replaced custom entities
-            for replacement, character in custom_entities.items():
-                pretty_xml = re.sub(replacement, character.replace('\\', '\\\\'), pretty_xml)
+            # Restore the replaced custom entities. The sentinels are literal strings, so str.replace is enough and
+            # no backslash doubling is needed.
+            for replacement, character in _CUSTOM_ENTITIES.items():
+                pretty_xml = pretty_xml.replace(replacement, character)
 
             tmp_file.write(pretty_xml)
     except Exception as e:
@@ -978,8 +1103,9 @@ def upload_group_configuration(group_id: str, file_content: str) -> str:
     try:
         # check Wazuh xml format
         try:
-            subprocess.check_output([os_path.join(common.WAZUH_PATH, "bin", "verify-agent-conf"), '-f', tmp_file_path],
-                                    stderr=subprocess.STDOUT)
+            # A minimal environment keeps the fork cheap; the binary is resolved through its absolute path
+            subprocess.check_output([_VERIFY_AGENT_CONF_BIN, '-f', tmp_file_path], stderr=subprocess.STDOUT,
+                                    env={'PATH': '/usr/bin:/bin'}, close_fds=True)
         except subprocess.CalledProcessError as e:
             # extract error message from output.
             # Example of raw output
@@ -990,8 +1116,7 @@ def upload_group_configuration(group_id: str, file_content: str) -> str:
             # Example of desired output:
             # Invalid element in the configuration: 'agent_conf'.
             # Syscheck remote configuration in '/var/ossec/tmp/api_tmp_file_2019-01-08-01-1546959069.xml' is corrupted.
-            output_regex = re.findall(pattern=r"\d{4}\/\d{2}\/\d{2} \d{2}:\d{2}:\d{2} verify-agent-conf: ERROR: "
-                                              r"\(\d+\): ([\w \/ \_ \- \. ' :]+)", string=e.output.decode())
+            output_regex = _RE_VERIFY_AGENT_CONF_ERR.findall(e.output.decode())
             if output_regex:
                 raise WazuhError(1114, ' '.join(output_regex))
             else:
@@ -1001,7 +1126,7 @@ def upload_group_configuration(group_id: str, file_content: str) -> str:
 
         # move temporary file to group folder
         try:
-            new_conf_path = os_path.join(common.SHARED_PATH, group_id, "agent.conf")
+            new_conf_path = os_path.join(group_path, "agent.conf")
             safe_move(tmp_file_path, new_conf_path, ownership=(common.wazuh_uid(), common.wazuh_gid()),
                       permissions=0o660)
         except Exception as e:
@@ -1010,8 +1135,10 @@ def upload_group_configuration(group_id: str, file_content: str) -> str:
         return 'Agent configuration was successfully updated'
     except Exception as e:
         # remove created temporary file
-        if os.path.exists(tmp_file_path):
+        try:
             remove(tmp_file_path)
+        except FileNotFoundError:
+            pass
         raise e
 
 
@@ -1054,6 +1181,24 @@ def upload_group_file(group_id: str, file_data: str, file_name: str = 'agent.con
         raise WazuhError(1111)
 
 
+@lru_cache(maxsize=1)
+def _read_authd_pass_cached(mtime_ns: int) -> str:
+    """Read the authd.pass file, reusing the cached content while its modification time does not change.
+
+    Parameters
+    ----------
+    mtime_ns : int
+        Modification time of the file, in nanoseconds. Used as cache key.
+
+    Returns
+    -------
+    str
+        The authd password.
+    """
+    with open(_AUTHD_PASS_PATH, 'r') as f:
+        return f.read().rstrip()
+
+
 def get_active_configuration(agent_id: str, component: str, configuration: str) -> str:
     """Get an agent's component active configuration.
 
@@ -1091,25 +1236,20 @@ def get_active_configuration(agent_id: str, component: str, configuration: str)
     if not component or not configuration:
         raise WazuhError(1307)
 
-    components = {"agent", "agentless", "analysis", "auth", "com", "csyslog", "integrator", "logcollector", "mail",
-                  "monitor", "request", "syscheck", "wmodules"}
-
     # checks if the component is correct
-    if component not in components:
-        raise WazuhError(1101, f'Valid components: {", ".join(components)}')
-
-    sockets_path = os_path.join(common.WAZUH_PATH, "queue", "sockets")
+    if component not in _VALID_COMPONENTS:
+        raise WazuhError(1101, _VALID_COMPONENTS_MSG)
 
     if agent_id == '000':
-        dest_socket = os_path.join(sockets_path, component)
-        command = f"getconfig {configuration}"
+        dest_socket = os_path.join(_SOCKETS_PATH, component)
+        command = b"getconfig " + configuration.encode()
         # Verify component configuration
         if not os.path.exists(dest_socket):
             raise WazuhError(1121, extra_message=f"please verify that the component '{component}' \
                 is properly configured")
     else:
-        dest_socket = os_path.join(sockets_path, "request")
-        command = f"{str(agent_id).zfill(3)} {component} getconfig {configuration}"
+        dest_socket = os_path.join(_SOCKETS_PATH, "request")
+        command = b"%03d %s getconfig %s" % (int(agent_id), component.encode(), configuration.encode())
 
     # Socket connection
     try:
@@ -1118,12 +1258,14 @@ def get_active_configuration(agent_id: str, component: str, configuration: str)
         raise WazuhInternalError(1121)
 
     # Send message
-    s.send(command.encode())
+    s.send(command)
 
     # Receive response
     try:
         # Receive data length
-        rec_msg_ok, rec_msg = s.receive().decode().split(" ", 1)
+        rec_msg_ok, sep, rec_msg = s.receive().decode().partition(' ')
+        if not sep:
+            raise ValueError
     except ValueError:
         raise WazuhInternalError(1118, extra_message="Data could not be received")
 
@@ -1135,14 +1277,13 @@ def get_active_configuration(agent_id: str, component: str, configuration: str)
         # Include password if auth->use_password enabled and authd.pass file exists
         if msg.get('auth', {}).get('use_password') == 'yes':
             try:
-                with open(os_path.join(common.WAZUH_PATH, "etc", "authd.pass"), 'r') as f:
-                    msg['authd.pass'] = f.read().rstrip()
+                msg['authd.pass'] = _read_authd_pass_cached(os.stat(_AUTHD_PASS_PATH).st_mtime_ns)
             except IOError:
                 pass
 
         return msg
     else:
-        raise WazuhError(1117 if "No such file or directory" in rec_msg or "Cannot send request" in rec_msg else 1116,
+        raise WazuhError(1117 if _ERR_1117_RE.search(rec_msg) else 1116,
                          extra_message=f'{component}:{configuration}')
 
 
@@ -1161,6 +1302,6 @@ def write_ossec_conf(new_conf: str):
     """
     try:
         with open(common.OSSEC_CONF, 'w') as f:
-            f.writelines(new_conf)
+            f.write(new_conf)
     except Exception:
         raise WazuhError(1126)
@@ -91,7 +91,7 @@ def test_read_option():
 
 
 def test_agentconf2json():
-    xml_conf = configuration.load_wazuh_xml(
+    xml_conf = configuration.load_wazuh_xml_iter(
         os.path.join(parent_directory, tmp_path, 'configuration/default/agent1.conf'))
 
     assert configuration._agentconf2json(xml_conf=xml_conf)[0]['filters'] == {'name': 'agent_name'}
@@ -128,11 +128,11 @@ def test_rootkit_trojans2json():
 
 
 def test_get_ossec_conf():
-    with patch('wazuh.core.configuration.load_wazuh_xml', return_value=Exception):
+    with patch('wazuh.core.configuration.load_wazuh_xml_iter', return_value=Exception):
         with pytest.raises(WazuhError, match=".* 1101 .*"):
             configuration.get_ossec_conf()
 
-    with patch('wazuh.core.configuration.load_wazuh_xml', return_value=Exception):
+    with patch('wazuh.core.configuration.load_wazuh_xml_iter', return_value=Exception):
         with pytest.raises(SystemExit) as pytest_wrapped_e:
             configuration.get_ossec_conf(from_import=True)
         assert pytest_wrapped_e.type == SystemExit
@@ -179,7 +179,7 @@ def test_get_agent_conf():
             configuration.get_agent_conf(group_id='default', filename='noexists.conf')
 
     with patch('wazuh.core.common.SHARED_PATH', new=os.path.join(parent_directory, tmp_path, 'configuration')):
-        with patch('wazuh.core.configuration.load_wazuh_xml', return_value=Exception):
+        with patch('wazuh.core.configuration.load_wazuh_xml_iter', return_value=Exception):
             with pytest.raises(WazuhError, match=".* 1101 .*"):
                 assert isinstance(configuration.get_agent_conf(group_id='default'), dict)
 
@@ -196,7 +196,7 @@ def test_get_agent_conf_multigroup():
             configuration.get_agent_conf_multigroup(multigroup_id='multigroup', filename='noexists.conf')
 
     with patch('wazuh.core.common.MULTI_GROUPS_PATH', new=os.path.join(parent_directory, tmp_path, 'configuration')):
-        with patch('wazuh.core.configuration.load_wazuh_xml', return_value=Exception):
+        with patch('wazuh.core.configuration.load_wazuh_xml_iter', return_value=Exception):
             with pytest.raises(WazuhError, match=".* 1101 .*"):
                 configuration.get_agent_conf_multigroup(multigroup_id='multigroup')
 
@@ -298,10 +298,11 @@ def test_upload_group_configuration(mock_open, mock_wazuh_uid, mock_wazuh_gid):
                                                                              "<agent_config>new_config</agent_config>")
             with patch('wazuh.core.configuration.subprocess.check_output',
                        side_effect=subprocess.CalledProcessError(cmd='ls', returncode=1, output=b'ERROR')):
-                with patch('wazuh.core.configuration.re.findall', return_value=None):
+                with patch('wazuh.core.configuration._RE_VERIFY_AGENT_CONF_ERR') as mock_verify_re:
+                    mock_verify_re.findall.return_value = None
                     with pytest.raises(WazuhError, match=".* 1115 .*"):
                         configuration.upload_group_configuration('default', "<agent_config>new_config</agent_config>")
-                with patch('wazuh.core.configuration.re.findall', return_value='1114'):
+                    mock_verify_re.findall.return_value = '1114'
                     with patch('os.path.exists', return_value=True):
                         with patch('wazuh.core.configuration.remove') as mock_remove:
                             with pytest.raises(WazuhError, match=".* 1114 .*"):
@@ -353,8 +354,9 @@ def test_get_active_configuration(mock_exists, agent_id, component, config, msg)
                         assert 'authd.pass' not in result
 
                         with patch('builtins.open', mock_open(read_data='test_password')):
-                            result = configuration.get_active_configuration(agent_id, component, config)
-                            assert result['authd.pass'] == 'test_password'
+                            with patch('os.stat'):
+                                result = configuration.get_active_configuration(agent_id, component, config)
+                                assert result['authd.pass'] == 'test_password'
                     else:
                         result = configuration.get_active_configuration(agent_id, component, config)
                         assert 'authd.pass' not in result
@@ -389,7 +391,7 @@ def test_write_ossec_conf():
     with patch('wazuh.core.configuration.open', mock_open()) as mocked_file:
         configuration.write_ossec_conf(new_conf=content)
         mocked_file.assert_called_once_with(OSSEC_CONF, 'w')
-        mocked_file().writelines.assert_called_once_with(content)
+        mocked_file().write.assert_called_once_with(content)
 
 
 def test_write_ossec_conf_exceptions():
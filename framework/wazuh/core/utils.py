@@ -16,6 +16,7 @@ import typing
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 from functools import wraps
+from io import StringIO
 from itertools import groupby, chain
 from os import chmod, chown, listdir, mkdir, curdir, rename, utime, remove, walk, path
 from pyexpat import ExpatError
@@ -23,7 +24,7 @@ from shutil import Error, move, copy2
 from signal import signal, alarm, SIGALRM, SIGKILL
 
 from cachetools import cached, TTLCache
-from defusedxml.ElementTree import fromstring
+from defusedxml.ElementTree import fromstring, iterparse
 from defusedxml.minidom import parseString
 
 import wazuh.core.results as results
@@ -874,7 +875,14 @@ def check_remote_commands(data: str):
         check_section(command_section, section='wodle_command', split_section='<wodle name=\"command\">')
 
 
-def load_wazuh_xml(xml_path, data=None):
+def _load_wazuh_xml_data(xml_path, data=None):
+    """Read a Wazuh XML file and sanitize its content so it can be fed to an XML parser.
+
+    Returns
+    -------
+    str
+        Sanitized XML document, wrapped in a root tag and with the custom entities declared.
+    """
     if not data:
         with open(xml_path) as f:
             data = f.read()
@@ -915,7 +923,29 @@ def load_wazuh_xml(xml_path, data=None):
                '\n'.join([f'<!ENTITY {name} "{value}">' for name, value in custom_entities.items()]) + \
                '\n]>\n'
 
-    return fromstring(entities + '<root_tag>' + data + '</root_tag>', forbid_entities=False)
+    return entities + '<root_tag>' + data + '</root_tag>'
+
+
+def load_wazuh_xml(xml_path, data=None):
+    return fromstring(_load_wazuh_xml_data(xml_path, data=data), forbid_entities=False)
+
+
+def load_wazuh_xml_iter(xml_path, data=None):
+    """Iterate over the top-level elements of a Wazuh XML file without keeping the whole tree in memory.
+
+    Each direct child of the document root is yielded once it has been fully parsed and cleared afterwards, so peak
+    memory stays proportional to the largest section instead of the whole file.
+    """
+    depth = 0
+    for event, elem in iterparse(StringIO(_load_wazuh_xml_data(xml_path, data=data)), events=('start', 'end'),
+                                 forbid_entities=False):
+        if event == 'start':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 1:
+                yield elem
+                elem.clear()
 
 
 class WazuhVersion:
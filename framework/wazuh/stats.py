@@ -4,6 +4,7 @@
 
 
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 from wazuh.core.agent import Agent, get_agents_info
 from wazuh.core.cluster.cluster import get_node
@@ -16,9 +17,26 @@ from wazuh.rbac.decorators import expose_resources
 cluster_enabled = not read_cluster_config(from_import=True)['disabled']
 node_id = get_node().get('node') if cluster_enabled else None
 
-
-@expose_resources(actions=[f"{'cluster' if cluster_enabled else 'manager'}:read"],
-                  resources=[f'node:id:{node_id}' if cluster_enabled else '*:*:*'])
+# Precomputed RBAC action/resource shared by every node stats endpoint
+_NODE_ACTION = f"{'cluster' if cluster_enabled else 'manager'}:read"
+_NODE_RESOURCE = f'node:id:{node_id}' if cluster_enabled else '*:*:*'
+
+# Result messages built once. The results themselves cannot be shared because they hold mutable state
+_NODE_STATS_MSGS = {'all_msg': 'Statistical information for each node was successfully read',
+                    'some_msg': 'Could not read statistical information for some nodes',
+                    'none_msg': 'Could not read statistical information for any node'}
+_HOURLY_STATS_MSGS = {'all_msg': 'Statistical information per hour for each node was successfully read',
+                      'some_msg': 'Could not read statistical information per hour for some nodes',
+                      'none_msg': 'Could not read statistical information per hour for any node'}
+_WEEKLY_STATS_MSGS = {'all_msg': 'Statistical information per week for each node was successfully read',
+                      'some_msg': 'Could not read statistical information per week for some nodes',
+                      'none_msg': 'Could not read statistical information per week for any node'}
+_AGENT_STATS_MSGS = {'all_msg': 'Statistical information for each agent was successfully read',
+                     'some_msg': 'Could not read statistical information for some agents',
+                     'none_msg': 'Could not read statistical information for any agent'}
+
+
+@expose_resources(actions=[_NODE_ACTION], resources=[_NODE_RESOURCE])
 def totals(date: datetime.date) -> AffectedItemsWazuhResult:
     """Retrieve statistical information for the current or specified date.
 
@@ -32,10 +50,7 @@ def totals(date: datetime.date) -> AffectedItemsWazuhResult:
     AffectedItemsWazuhResult
         Array of dictionaries. Each dictionary represents an hour.
     """
-    result = AffectedItemsWazuhResult(all_msg='Statistical information for each node was successfully read',
-                                      some_msg='Could not read statistical information for some nodes',
-                                      none_msg='Could not read statistical information for any node'
-                                      )
+    result = AffectedItemsWazuhResult(**_NODE_STATS_MSGS)
     affected = totals_(date)
     result.affected_items = affected
     result.total_affected_items = len(result.affected_items)
@@ -43,8 +58,7 @@ def totals(date: datetime.date) -> AffectedItemsWazuhResult:
     return result
 
 
-@expose_resources(actions=[f"{'cluster' if cluster_enabled else 'manager'}:read"],
-                  resources=[f'node:id:{node_id}' if cluster_enabled else '*:*:*'])
+@expose_resources(actions=[_NODE_ACTION], resources=[_NODE_RESOURCE])
 def hourly() -> AffectedItemsWazuhResult:
     """Compute hourly averages.
 
@@ -53,18 +67,14 @@ def hourly() -> AffectedItemsWazuhResult:
     AffectedItemsWazuhResult
         Dictionary with averages and interactions.
     """
-    result = AffectedItemsWazuhResult(all_msg='Statistical information per hour for each node was successfully read',
-                                      some_msg='Could not read statistical information per hour for some nodes',
-                                      none_msg='Could not read statistical information per hour for any node'
-                                      )
+    result = AffectedItemsWazuhResult(**_HOURLY_STATS_MSGS)
     result.affected_items = hourly_()
     result.total_affected_items = len(result.affected_items)
 
     return result
 
 
-@expose_resources(actions=[f"{'cluster' if cluster_enabled else 'manager'}:read"],
-                  resources=[f'node:id:{node_id}' if cluster_enabled else '*:*:*'])
+@expose_resources(actions=[_NODE_ACTION], resources=[_NODE_RESOURCE])
 def weekly() -> AffectedItemsWazuhResult:
     """Compute weekly averages.
 
@@ -73,18 +83,14 @@ def weekly() -> AffectedItemsWazuhResult:
     AffectedItemsWazuhResult
         Dictionary for each week day.
     """
-    result = AffectedItemsWazuhResult(all_msg='Statistical information per week for each node was successfully read',
-                                      some_msg='Could not read statistical information per week for some nodes',
-                                      none_msg='Could not read statistical information per week for any node'
-                                      )
+    result = AffectedItemsWazuhResult(**_WEEKLY_STATS_MSGS)
     result.affected_items = weekly_()
     result.total_affected_items = len(result.affected_items)
 
     return result
 
 
-@expose_resources(actions=[f"{'cluster' if cluster_enabled else 'manager'}:read"],
-                  resources=[f'node:id:{node_id}' if cluster_enabled else '*:*:*'])
+@expose_resources(actions=[_NODE_ACTION], resources=[_NODE_RESOURCE])
 def get_daemons_stats(filename: str) -> AffectedItemsWazuhResult:
     """Get daemons stats from an input file.
 
@@ -98,11 +104,7 @@ def get_daemons_stats(filename: str) -> AffectedItemsWazuhResult:
     AffectedItemsWazuhResult
         Dictionary with the stats of the input file.
     """
-    result = AffectedItemsWazuhResult(
-        all_msg='Statistical information for each node was successfully read',
-        some_msg='Could not read statistical information for some nodes',
-        none_msg='Could not read statistical information for any node'
-    )
+    result = AffectedItemsWazuhResult(**_NODE_STATS_MSGS)
     result.affected_items = get_daemons_stats_(filename)
     result.total_affected_items = len(result.affected_items)
 
@@ -125,17 +127,26 @@ def get_agents_component_stats_json(agent_list: list = None, component: str = No
     AffectedItemsWazuhResult
         Component stats.
     """
-    result = AffectedItemsWazuhResult(all_msg='Statistical information for each agent was successfully read',
-                                      some_msg='Could not read statistical information for some agents',
-                                      none_msg='Could not read statistical information for any agent')
-    system_agents = get_agents_info()
-    for agent_id in agent_list:
+    result = AffectedItemsWazuhResult(**_AGENT_STATS_MSGS)
+    system_agents = frozenset(get_agents_info())
+
+    def fetch_stats(agent_id: str) -> tuple:
+        """Get the component stats of a single agent, returning any Wazuh error instead of raising it."""
         try:
             if agent_id not in system_agents:
                 raise WazuhResourceNotFound(1701)
-            result.affected_items.append(Agent(agent_id).get_stats(component=component))
+            return agent_id, Agent(agent_id).get_stats(component=component), None
         except WazuhException as e:
-            result.add_failed_item(id_=agent_id, error=e)
+            return agent_id, None, e
+
+    if agent_list:
+        # Query the agents concurrently instead of opening one socket at a time
+        with ThreadPoolExecutor(max_workers=min(32, len(agent_list))) as executor:
+            for agent_id, stats, error in executor.map(fetch_stats, agent_list):
+                if error is None:
+                    result.affected_items.append(stats)
+                else:
+                    result.add_failed_item(id_=agent_id, error=error)
     result.total_affected_items = len(result.affected_items)
 
     return result